@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+
+_CELL_RE = re.compile(r"([A-Za-z]+)(\d+)")
+
+
+@lru_cache(maxsize=1024)
+def cell_to_col_row(cell: str) -> tuple[int, int]:
+    """
+    Convert an Excel A1 cell reference (e.g. 'K6') into (col_number, row_number).
+    Column is 1-based (A=1), row is int.
+
+    Tokenization is one precompiled regex fullmatch instead of per-character
+    classification, and results are cached: the writers re-parse the same
+    handful of template anchors on every invoice.
+    """
+    cell = cell.strip().upper()
+    if not cell:
+        raise ValueError("Cell reference cannot be empty.")
+
+    m = _CELL_RE.fullmatch(cell)
+    if m is None:
+        raise ValueError(f"Invalid cell reference: {cell}")
+
+    letters, row = m.group(1), int(m.group(2))
+    if row <= 0:
+        raise ValueError(f"Invalid row in cell reference: {cell}")
+
+    col = 0
+    for ch in letters:
+        col = col * 26 + (ord(ch) - ord("A") + 1)
+
+    return col, row
@@ -1,142 +1,300 @@
-from __future__ import annotations
-
-import os
-import random
-from typing import Tuple
-
-import win32com.client as win32  # type: ignore
-
-
-def apply_control_numbers(
-    file_path: str,
-    *,
-    start_number: int,
-    total_pages: int,
-    first_page_cell: str = "K6",
-    second_page_cell: str = "K55",
-    sheet_index: int = 1,
-    visible: bool = False,
-    max_pages: int = 50,
-    min_jump: int = 1,
-    max_jump: int = 11,
-) -> None:
-    """
-    Applies a red, 6-digit control number to each invoice page.
-
-    - Page anchor is derived from the row difference between first_page_cell and second_page_cell.
-    - The number increments randomly by a jump in [min_jump, max_jump].
-    - Always displayed as 6 digits (leading zeros preserved).
-    - Text is always red.
-
-    Args:
-        file_path: Existing .xlsx file.
-        start_number: Control number to place on page 1 (e.g. 968 -> displays as 000968).
-        total_pages: Pages that exist/should be numbered.
-        first_page_cell: Control number cell for page 1 (default K6).
-        second_page_cell: Control number cell for page 2 (default K55).
-        sheet_index: 1-based worksheet index.
-        visible: Show Excel UI (debugging).
-        max_pages: Hard cap to avoid writing too far (default 50).
-        min_jump: Minimum random increment (default 1).
-        max_jump: Maximum random increment (default 11).
-    """
-    if start_number < 0:
-        raise ValueError("start_number must be >= 0.")
-    if not (0 <= start_number <= 999_999):
-        raise ValueError("start_number must fit in 6 digits (0..999999).")
-    if total_pages <= 0:
-        return
-    if min_jump <= 0 or max_jump < min_jump:
-        raise ValueError("Invalid jump range. Ensure 1 <= min_jump <= max_jump.")
-
-    pages_to_apply = min(total_pages, max_pages)
-
-    abs_path = os.path.abspath(file_path)
-    if not os.path.exists(abs_path):
-        raise FileNotFoundError(f"Excel file not found: {abs_path}")
-
-    col, first_row = _cell_to_col_row(first_page_cell)
-    _, second_row = _cell_to_col_row(second_page_cell)
-
-    page_row_step = second_row - first_row
-    if page_row_step <= 0:
-        raise ValueError(
-            f"Invalid page stride: '{second_page_cell}' must be below '{first_page_cell}'."
-        )
-
-    excel = win32.DispatchEx("Excel.Application")
-    excel.Visible = visible
-    excel.DisplayAlerts = False
-
-    wb = None
-    try:
-        wb = excel.Workbooks.Open(abs_path)
-        ws = wb.Worksheets(sheet_index)
-
-        current = start_number
-
-        for page_index in range(pages_to_apply):
-            row = first_row + page_index * page_row_step
-            cell = ws.Cells(row, col)
-
-            # Ensure 6 digits are displayed (leading zeros).
-            cell.NumberFormat = "000000"
-            cell.Value = int(current)
-
-            # Make it red (Excel/VBA vbRed == 255).
-            cell.Font.Color = 255
-
-            # Next number: random jump 1..11
-            jump = random.randint(min_jump, max_jump)
-            current += jump
-
-            if current > 999_999:
-                raise ValueError(
-                    f"Control number exceeded 6 digits on page {page_index + 1}. "
-                    f"Current={current}. Choose a smaller start_number."
-                )
-
-        wb.Save()
-        last_written = start_number  # compute last written for message
-        # (We don't store all numbers; message kept simple and safe.)
-        print(f"Applied {pages_to_apply} red control number(s) to {file_path}")
-
-    finally:
-        if wb is not None:
-            wb.Close(SaveChanges=True)
-        excel.Quit()
-
-
-def _cell_to_col_row(cell: str) -> Tuple[int, int]:
-    """
-    Convert an Excel A1 cell reference (e.g. 'K6') into (col_number, row_number).
-    Column is 1-based (A=1).
-    """
-    cell = cell.strip().upper()
-    if not cell:
-        raise ValueError("Cell reference cannot be empty.")
-
-    letters = []
-    digits = []
-    for ch in cell:
-        if "A" <= ch <= "Z":
-            if digits:
-                raise ValueError(f"Invalid cell reference: {cell}")
-            letters.append(ch)
-        elif "0" <= ch <= "9":
-            digits.append(ch)
-        else:
-            raise ValueError(f"Invalid cell reference: {cell}")
-
-    if not letters or not digits:
-        raise ValueError(f"Invalid cell reference: {cell}")
-
-    col = 0
-    for ch in letters:
-        col = col * 26 + (ord(ch) - ord("A") + 1)
-
-    row = int("".join(digits))
-    if row <= 0:
-        raise ValueError(f"Invalid row in cell reference: {cell}")
-
-    return col, row
+from __future__ import annotations
+
+import itertools
+import os
+import random
+
+import win32com.client as win32  # type: ignore
+from openpyxl import load_workbook
+from openpyxl.styles import Font
+
+from cellref import cell_to_col_row
+
+# Excel enum: xlCalculationManual
+XL_CALCULATION_MANUAL = -4135
+
+
+def _validate_control_inputs(
+    *,
+    start_number: int,
+    first_page_cell: str,
+    second_page_cell: str,
+    min_jump: int,
+    max_jump: int,
+) -> tuple[int, int, int]:
+    """
+    Deterministic input checks shared by both backends (and run as a
+    preflight before Excel is started). Returns (col, first_row, page_row_step).
+    """
+    if start_number < 0:
+        raise ValueError("start_number must be >= 0.")
+    if not (0 <= start_number <= 999_999):
+        raise ValueError("start_number must fit in 6 digits (0..999999).")
+    if min_jump <= 0 or max_jump < min_jump:
+        raise ValueError("Invalid jump range. Ensure 1 <= min_jump <= max_jump.")
+
+    col, first_row = cell_to_col_row(first_page_cell)
+    _, second_row = cell_to_col_row(second_page_cell)
+
+    page_row_step = second_row - first_row
+    if page_row_step <= 0:
+        raise ValueError(
+            f"Invalid page stride: '{second_page_cell}' must be below '{first_page_cell}'."
+        )
+
+    return col, first_row, page_row_step
+
+
+def _plan_control_numbers(
+    *,
+    start_number: int,
+    total_pages: int,
+    first_page_cell: str,
+    second_page_cell: str,
+    max_pages: int,
+    min_jump: int,
+    max_jump: int,
+) -> tuple[int, list[int], list[int]]:
+    """
+    Validate inputs and precompute the target column, anchor rows, and the
+    random number sequence shared by both backends. Overflow past 6 digits is
+    caught here, before any cell is touched.
+    """
+    col, first_row, page_row_step = _validate_control_inputs(
+        start_number=start_number,
+        first_page_cell=first_page_cell,
+        second_page_cell=second_page_cell,
+        min_jump=min_jump,
+        max_jump=max_jump,
+    )
+
+    pages_to_apply = min(total_pages, max_pages) if total_pages > 0 else 0
+
+    # Draw all jumps in one batch and cumulate, instead of one randint call
+    # per page. Only the pages_to_apply - 1 jumps between written numbers are
+    # drawn, so an overflow can only be reported for a number that would
+    # actually land on a page.
+    jumps = random.choices(range(min_jump, max_jump + 1), k=max(pages_to_apply - 1, 0))
+    numbers = list(itertools.accumulate([start_number] + jumps))[:pages_to_apply]
+
+    if numbers and numbers[-1] > 999_999:
+        overflow_page = next(i for i, n in enumerate(numbers) if n > 999_999)
+        raise ValueError(
+            f"Control number exceeded 6 digits on page {overflow_page + 1}. "
+            f"Current={numbers[overflow_page]}. Choose a smaller start_number."
+        )
+
+    anchor_rows = [first_row + page_index * page_row_step for page_index in range(pages_to_apply)]
+    return col, anchor_rows, numbers
+
+
+def _write_control_numbers(
+    ws,
+    *,
+    start_number: int,
+    total_pages: int,
+    first_page_cell: str = "K6",
+    second_page_cell: str = "K55",
+    max_pages: int = 50,
+    min_jump: int = 1,
+    max_jump: int = 11,
+) -> int:
+    """
+    Write red, 6-digit control numbers into an already-open COM worksheet.
+
+    - Page anchor is derived from the row difference between first_page_cell and second_page_cell.
+    - The number increments randomly by a jump in [min_jump, max_jump].
+    - Always displayed as 6 digits (leading zeros preserved).
+    - Text is always red.
+
+    Returns:
+        Number of pages actually numbered.
+    """
+    col, anchor_rows, numbers = _plan_control_numbers(
+        start_number=start_number,
+        total_pages=total_pages,
+        first_page_cell=first_page_cell,
+        second_page_cell=second_page_cell,
+        max_pages=max_pages,
+        min_jump=min_jump,
+        max_jump=max_jump,
+    )
+    if not anchor_rows:
+        return 0
+
+    # All target cells sit on one column at a fixed stride, so formatting can
+    # be applied to a discontiguous Union range in one COM call per property
+    # instead of one per page.
+    app = ws.Application
+    cells = ws.Cells  # bind once; every ws.Cells lookup is a COM dispatch
+    target = cells(anchor_rows[0], col)
+    for row in anchor_rows[1:]:
+        target = app.Union(target, cells(row, col))
+
+    # Ensure 6 digits are displayed (leading zeros).
+    target.NumberFormat = "000000"
+
+    # Make it red (Excel/VBA vbRed == 255).
+    target.Font.Color = 255
+
+    # Values cannot be bulk-assigned to a discontiguous range, so the
+    # anchors are written individually (bounded by max_pages).
+    for row, number in zip(anchor_rows, numbers):
+        cells(row, col).Value = number
+
+    pages_to_apply = len(anchor_rows)
+    print(f"Applied {pages_to_apply} red control number(s).")
+    return pages_to_apply
+
+
+def _write_control_numbers_xlsx(
+    ws,
+    *,
+    start_number: int,
+    total_pages: int,
+    first_page_cell: str = "K6",
+    second_page_cell: str = "K55",
+    max_pages: int = 50,
+    min_jump: int = 1,
+    max_jump: int = 11,
+) -> int:
+    """
+    openpyxl twin of _write_control_numbers: writes into an already-loaded
+    openpyxl worksheet. Same red, 6-digit display rules.
+
+    Returns:
+        Number of pages actually numbered.
+    """
+    col, anchor_rows, numbers = _plan_control_numbers(
+        start_number=start_number,
+        total_pages=total_pages,
+        first_page_cell=first_page_cell,
+        second_page_cell=second_page_cell,
+        max_pages=max_pages,
+        min_jump=min_jump,
+        max_jump=max_jump,
+    )
+    if not anchor_rows:
+        return 0
+
+    red = Font(color="FF0000")
+    for row, number in zip(anchor_rows, numbers):
+        cell = ws.cell(row=row, column=col, value=number)
+        cell.number_format = "000000"
+        cell.font = red
+
+    pages_to_apply = len(anchor_rows)
+    print(f"Applied {pages_to_apply} red control number(s).")
+    return pages_to_apply
+
+
+def apply_control_numbers(
+    file_path: str,
+    *,
+    start_number: int,
+    total_pages: int,
+    first_page_cell: str = "K6",
+    second_page_cell: str = "K55",
+    sheet_index: int = 1,
+    visible: bool = False,
+    max_pages: int = 50,
+    min_jump: int = 1,
+    max_jump: int = 11,
+    use_com: bool = False,
+) -> None:
+    """
+    Applies a red, 6-digit control number to each invoice page.
+
+    By default the workbook is edited in-process with openpyxl; pass
+    use_com=True to go through Excel COM instead. Prefer
+    orchestrator.apply_all when running several passes against the same
+    workbook.
+
+    Args:
+        file_path: Existing .xlsx file.
+        start_number: Control number to place on page 1 (e.g. 968 -> displays as 000968).
+        total_pages: Pages that exist/should be numbered.
+        first_page_cell: Control number cell for page 1 (default K6).
+        second_page_cell: Control number cell for page 2 (default K55).
+        sheet_index: 1-based worksheet index.
+        visible: Show Excel UI (COM only, debugging).
+        max_pages: Hard cap to avoid writing too far (default 50).
+        min_jump: Minimum random increment (default 1).
+        max_jump: Maximum random increment (default 11).
+        use_com: Drive Excel via COM instead of openpyxl.
+    """
+    abs_path = os.path.abspath(file_path)
+    if not os.path.exists(abs_path):
+        raise FileNotFoundError(f"Excel file not found: {abs_path}")
+
+    if not use_com:
+        wb = load_workbook(abs_path)
+        ws = wb.worksheets[sheet_index - 1]
+        _write_control_numbers_xlsx(
+            ws,
+            start_number=start_number,
+            total_pages=total_pages,
+            first_page_cell=first_page_cell,
+            second_page_cell=second_page_cell,
+            max_pages=max_pages,
+            min_jump=min_jump,
+            max_jump=max_jump,
+        )
+        wb.save(abs_path)
+        return
+
+    # Validate everything deterministic before paying the Excel startup;
+    # a bad config should never boot Excel just to raise.
+    _validate_control_inputs(
+        start_number=start_number,
+        first_page_cell=first_page_cell,
+        second_page_cell=second_page_cell,
+        min_jump=min_jump,
+        max_jump=max_jump,
+    )
+
+    excel = win32.DispatchEx("Excel.Application")
+    excel.Visible = visible
+    excel.DisplayAlerts = False
+    excel.AskToUpdateLinks = False
+
+    wb = None
+    prev_calc = None
+    try:
+        wb = excel.Workbooks.Open(
+            abs_path,
+            UpdateLinks=0,
+            ReadOnly=False,
+            IgnoreReadOnlyRecommended=True,
+            Notify=False,
+            AddToMru=False,
+            Local=True,
+        )
+        ws = wb.Worksheets(sheet_index)
+
+        prev_calc = excel.Calculation
+        excel.ScreenUpdating = False
+        excel.EnableEvents = False
+        excel.Calculation = XL_CALCULATION_MANUAL
+
+        _write_control_numbers(
+            ws,
+            start_number=start_number,
+            total_pages=total_pages,
+            first_page_cell=first_page_cell,
+            second_page_cell=second_page_cell,
+            max_pages=max_pages,
+            min_jump=min_jump,
+            max_jump=max_jump,
+        )
+
+        wb.Save()
+
+    finally:
+        if prev_calc is not None:
+            excel.Calculation = prev_calc
+            excel.EnableEvents = True
+            excel.ScreenUpdating = True
+        if wb is not None:
+            wb.Close(SaveChanges=True)
+        excel.Quit()
@@ -1,102 +1,215 @@
-from __future__ import annotations
-
-import os
-from typing import Optional
-
-import win32com.client as win32  # type: ignore
-
-def _cell_to_col_row(cell: str) -> tuple[int, int]:
-    """
-    Convert an Excel A1 cell reference (e.g. 'E10') into (col_number, row_number).
-    Column is 1-based (A=1), row is int.
-    """
-    cell = cell.strip().upper()
-    if not cell:
-        raise ValueError("Cell reference cannot be empty.")
-
-    letters = []
-    digits = []
-    for ch in cell:
-        if "A" <= ch <= "Z":
-            if digits:
-                raise ValueError(f"Invalid cell reference: {cell}")
-            letters.append(ch)
-        elif "0" <= ch <= "9":
-            digits.append(ch)
-        else:
-            raise ValueError(f"Invalid cell reference: {cell}")
-
-    if not letters or not digits:
-        raise ValueError(f"Invalid cell reference: {cell}")
-
-    col = 0
-    for ch in letters:
-        col = col * 26 + (ord(ch) - ord("A") + 1)
-
-    row = int("".join(digits))
-    if row <= 0:
-        raise ValueError(f"Invalid row in cell reference: {cell}")
-
-    return col, row
-
-def apply_invoice_numbers(
-    file_path: str,
-    *,
-    start_number: int,
-    total_pages: int,
-    first_page_cell: str = "E10",
-    second_page_cell: str = "E59",
-    sheet_index: int = 1,
-    visible: bool = False,
-    max_pages: int = 50,   # <-- NEW
-) -> None:
-    """
-    Writes sequential invoice numbers into a fixed template on one worksheet.
-
-    Applies numbering to at most `max_pages` pages.
-    """
-    if start_number <= 0:
-        raise ValueError("start_number must be a positive integer.")
-
-    if total_pages <= 0:
-        return
-
-    pages_to_apply = min(total_pages, max_pages)
-
-    abs_path = os.path.abspath(file_path)
-    if not os.path.exists(abs_path):
-        raise FileNotFoundError(f"Excel file not found: {abs_path}")
-
-    invoice_col, first_row = _cell_to_col_row(first_page_cell) # type: ignore
-    _, second_row = _cell_to_col_row(second_page_cell) # type: ignore
-
-    page_row_step = second_row - first_row
-    if page_row_step <= 0:
-        raise ValueError(
-            f"Invalid page stride: '{second_page_cell}' must be below '{first_page_cell}'."
-        )
-
-    excel = win32.DispatchEx("Excel.Application")
-    excel.Visible = visible
-    excel.DisplayAlerts = False
-
-    wb = None
-    try:
-        wb = excel.Workbooks.Open(abs_path)
-        ws = wb.Worksheets(sheet_index)
-
-        for page_index in range(pages_to_apply):
-            invoice_number = start_number + page_index
-            row = first_row + page_index * page_row_step
-            ws.Cells(row, invoice_col).Value = invoice_number
-
-        wb.Save()
-        print(
-            f"Applied invoice numbers {start_number}..{start_number + pages_to_apply - 1} "
-            f"({pages_to_apply} page(s)) to {file_path}"
-        )
-
-    finally:
-        if wb is not None:
-            wb.Close(SaveChanges=True)
-        excel.Quit()
+from __future__ import annotations
+
+import os
+
+import win32com.client as win32  # type: ignore
+from openpyxl import load_workbook
+
+from cellref import cell_to_col_row
+
+# Excel enum: xlCalculationManual
+XL_CALCULATION_MANUAL = -4135
+
+
+def _plan_invoice_numbers(
+    *,
+    start_number: int,
+    total_pages: int,
+    first_page_cell: str,
+    second_page_cell: str,
+    max_pages: int,
+) -> tuple[int, list[int], range]:
+    """
+    Validate inputs and precompute the target column, anchor rows, and the
+    number progression shared by both backends.
+    """
+    if start_number <= 0:
+        raise ValueError("start_number must be a positive integer.")
+
+    pages_to_apply = min(total_pages, max_pages) if total_pages > 0 else 0
+
+    invoice_col, first_row = cell_to_col_row(first_page_cell)
+    _, second_row = cell_to_col_row(second_page_cell)
+
+    page_row_step = second_row - first_row
+    if page_row_step <= 0:
+        raise ValueError(
+            f"Invalid page stride: '{second_page_cell}' must be below '{first_page_cell}'."
+        )
+
+    anchor_rows = [first_row + page_index * page_row_step for page_index in range(pages_to_apply)]
+    numbers = range(start_number, start_number + pages_to_apply)
+    return invoice_col, anchor_rows, numbers
+
+
+def _write_invoice_numbers(
+    ws,
+    *,
+    start_number: int,
+    total_pages: int,
+    first_page_cell: str = "E10",
+    second_page_cell: str = "E59",
+    max_pages: int = 50,
+) -> int:
+    """
+    Write sequential invoice numbers into an already-open COM worksheet.
+
+    Applies numbering to at most `max_pages` pages.
+
+    Returns:
+        Number of pages actually numbered.
+    """
+    invoice_col, anchor_rows, numbers = _plan_invoice_numbers(
+        start_number=start_number,
+        total_pages=total_pages,
+        first_page_cell=first_page_cell,
+        second_page_cell=second_page_cell,
+        max_pages=max_pages,
+    )
+    if not anchor_rows:
+        return 0
+
+    # The target cells are strided down one column, so a single contiguous
+    # Range.Value assignment is not possible; the per-cell writes are bounded
+    # by max_pages and run with app updates disabled at the session level.
+    cells = ws.Cells  # bind once; every ws.Cells lookup is a COM dispatch
+    for row, invoice_number in zip(anchor_rows, numbers):
+        cells(row, invoice_col).Value = invoice_number
+
+    pages_to_apply = len(anchor_rows)
+    print(
+        f"Applied invoice numbers {start_number}..{start_number + pages_to_apply - 1} "
+        f"({pages_to_apply} page(s))."
+    )
+    return pages_to_apply
+
+
+def _write_invoice_numbers_xlsx(
+    ws,
+    *,
+    start_number: int,
+    total_pages: int,
+    first_page_cell: str = "E10",
+    second_page_cell: str = "E59",
+    max_pages: int = 50,
+) -> int:
+    """
+    openpyxl twin of _write_invoice_numbers: writes into an already-loaded
+    openpyxl worksheet.
+
+    Returns:
+        Number of pages actually numbered.
+    """
+    invoice_col, anchor_rows, numbers = _plan_invoice_numbers(
+        start_number=start_number,
+        total_pages=total_pages,
+        first_page_cell=first_page_cell,
+        second_page_cell=second_page_cell,
+        max_pages=max_pages,
+    )
+    if not anchor_rows:
+        return 0
+
+    cell = ws.cell
+    for row, invoice_number in zip(anchor_rows, numbers):
+        cell(row=row, column=invoice_col, value=invoice_number)
+
+    pages_to_apply = len(anchor_rows)
+    print(
+        f"Applied invoice numbers {start_number}..{start_number + pages_to_apply - 1} "
+        f"({pages_to_apply} page(s))."
+    )
+    return pages_to_apply
+
+
+def apply_invoice_numbers(
+    file_path: str,
+    *,
+    start_number: int,
+    total_pages: int,
+    first_page_cell: str = "E10",
+    second_page_cell: str = "E59",
+    sheet_index: int = 1,
+    visible: bool = False,
+    max_pages: int = 50,
+    use_com: bool = False,
+) -> None:
+    """
+    Writes sequential invoice numbers into a fixed template on one worksheet.
+
+    By default the workbook is edited in-process with openpyxl; pass
+    use_com=True to go through Excel COM instead. Prefer
+    orchestrator.apply_all when running several passes against the same
+    workbook.
+    """
+    abs_path = os.path.abspath(file_path)
+    if not os.path.exists(abs_path):
+        raise FileNotFoundError(f"Excel file not found: {abs_path}")
+
+    if not use_com:
+        wb = load_workbook(abs_path)
+        ws = wb.worksheets[sheet_index - 1]
+        _write_invoice_numbers_xlsx(
+            ws,
+            start_number=start_number,
+            total_pages=total_pages,
+            first_page_cell=first_page_cell,
+            second_page_cell=second_page_cell,
+            max_pages=max_pages,
+        )
+        wb.save(abs_path)
+        return
+
+    # Validate before paying the Excel startup; the plan is deterministic,
+    # so a bad config should never boot Excel just to raise.
+    _plan_invoice_numbers(
+        start_number=start_number,
+        total_pages=total_pages,
+        first_page_cell=first_page_cell,
+        second_page_cell=second_page_cell,
+        max_pages=max_pages,
+    )
+
+    excel = win32.DispatchEx("Excel.Application")
+    excel.Visible = visible
+    excel.DisplayAlerts = False
+    excel.AskToUpdateLinks = False
+
+    wb = None
+    prev_calc = None
+    try:
+        wb = excel.Workbooks.Open(
+            abs_path,
+            UpdateLinks=0,
+            ReadOnly=False,
+            IgnoreReadOnlyRecommended=True,
+            Notify=False,
+            AddToMru=False,
+            Local=True,
+        )
+        ws = wb.Worksheets(sheet_index)
+
+        prev_calc = excel.Calculation
+        excel.ScreenUpdating = False
+        excel.EnableEvents = False
+        excel.Calculation = XL_CALCULATION_MANUAL
+
+        _write_invoice_numbers(
+            ws,
+            start_number=start_number,
+            total_pages=total_pages,
+            first_page_cell=first_page_cell,
+            second_page_cell=second_page_cell,
+            max_pages=max_pages,
+        )
+
+        wb.Save()
+
+    finally:
+        if prev_calc is not None:
+            excel.Calculation = prev_calc
+            excel.EnableEvents = True
+            excel.ScreenUpdating = True
+        if wb is not None:
+            wb.Close(SaveChanges=True)
+        excel.Quit()
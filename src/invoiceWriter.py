@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import os
+from datetime import date
+from typing import Any, Dict, List
+
+from openpyxl import load_workbook
+
+from invoicing import _write_products_xlsx
+from invoiceNumbering import _write_invoice_numbers_xlsx
+from controlNumbering import _write_control_numbers_xlsx
+from invoiceDating import InvoiceDatesConfig, _write_dates_xlsx
+
+
+def write_invoice(
+    template_path: str,
+    output_path: str,
+    products: List[Dict[str, Any]],
+    *,
+    invoice_start: int,
+    control_start: int,
+    start_date: date,
+    end_date: date,
+    total_pages: int,
+    first_page_items_row: int = 19,
+    control_first_cell: str = "K6",
+    control_second_cell: str = "K55",
+    dates_config: InvoiceDatesConfig = InvoiceDatesConfig(),
+    sheet_index: int = 1,
+) -> None:
+    """
+    Produce a finished invoice straight from the template in one pass, with
+    no Excel involved: load the template workbook, run all four write passes
+    in memory, and save once to output_path.
+
+    Compared to copying the template to the output location and then editing
+    it in place, this reads the template a single time and streams the
+    finished file out a single time — the intermediate copy and its extra
+    read/write cycle disappear. The template file itself is never modified.
+
+    Args:
+        template_path: Existing template .xlsx.
+        output_path: Destination for the finished invoice.
+        products: List of product dicts from load_products().
+        invoice_start: First invoice number (page 1).
+        control_start: First control number (page 1).
+        start_date, end_date: Inclusive invoice date range (weekdays).
+        total_pages: Pages that exist/should be written.
+        first_page_items_row: Row where item #1 of page 1 starts.
+        control_first_cell: Control number cell for page 1.
+        control_second_cell: Control number cell for page 2.
+        dates_config: Cell anchors and rules for the dating pass.
+        sheet_index: 1-based worksheet index.
+    """
+    abs_template = os.path.abspath(template_path)
+    if not os.path.exists(abs_template):
+        raise FileNotFoundError(f"Template not found: {abs_template}")
+
+    wb = load_workbook(abs_template)
+    ws = wb.worksheets[sheet_index - 1]
+
+    _write_products_xlsx(
+        ws,
+        products,
+        first_page_start_row=first_page_items_row,
+    )
+
+    _write_invoice_numbers_xlsx(
+        ws,
+        start_number=invoice_start,
+        total_pages=total_pages,
+    )
+
+    _write_control_numbers_xlsx(
+        ws,
+        start_number=control_start,
+        total_pages=total_pages,
+        first_page_cell=control_first_cell,
+        second_page_cell=control_second_cell,
+    )
+
+    _write_dates_xlsx(
+        ws,
+        total_pages=total_pages,
+        start_date=start_date,
+        end_date=end_date,
+        config=dates_config,
+    )
+
+    wb.save(os.path.abspath(output_path))
@@ -4,22 +4,41 @@ import os
 from typing import Any, Dict, List
 
 import win32com.client as win32  # type: ignore
+from openpyxl import Workbook, load_workbook
 
 
-def input_products_page(
+# Column offsets relative to start_col (B=2 in the template).
+COL_DESC = 0
+COL_QTY = 6
+COL_UNIT = 7
+COL_TOTAL = 9  # <-- K relative to start_col=2 (B)
+
+# Excel enum: xlCalculationManual
+XL_CALCULATION_MANUAL = -4135
+
+
+def _page_stride(first_page_start_row: int, second_page_start_row: int) -> int:
+    page_row_step = second_page_start_row - first_page_start_row
+    if page_row_step <= 0:
+        raise ValueError(
+            f"Invalid page stride: second_page_start_row ({second_page_start_row}) "
+            f"must be greater than first_page_start_row ({first_page_start_row})."
+        )
+    return page_row_step
+
+
+def _write_products(
+    ws,
     products: List[Dict[str, Any]],
-    file_path: str,
     *,
     first_page_start_row: int = 19,
     second_page_start_row: int = 68,
     start_col: int = 2,
     items_per_page: int = 9,
     row_step: int = 2,
-    sheet_index: int = 1,
-    visible: bool = False,
-) -> None:
+) -> int:
     """
-    Writes products into a fixed invoice template on ONE worksheet, across multiple pages.
+    Write product line items into an already-open COM worksheet.
 
     Page anchors are determined by the template:
       - Page 1 item 1 starts at first_page_start_row
@@ -33,6 +52,113 @@ def input_products_page(
       - precio_total    -> (item_row,     start_col + 8)
       - codigo label    -> (item_row + 1, start_col) as "NUMERO DE PARTE: <codigo>"
 
+    Returns:
+        Number of pages used.
+    """
+    if not products:
+        raise ValueError("products is empty. Provide at least one product.")
+
+    page_row_step = _page_stride(first_page_start_row, second_page_start_row)
+
+    pages_used = (len(products) + items_per_page - 1) // items_per_page
+
+    for page_index in range(pages_used):
+        page_products = products[page_index * items_per_page : (page_index + 1) * items_per_page]
+        page_start_row = first_page_start_row + page_index * page_row_step
+
+        # Rectangle covering every item row + label row of this page.
+        # Read the existing values once, patch them in memory, write the whole
+        # block back in one COM call: 6 round-trips per item become 2 per page.
+        last_label_row = page_start_row + (len(page_products) - 1) * row_step + 1
+        region = ws.Range(
+            ws.Cells(page_start_row, start_col),
+            ws.Cells(last_label_row, start_col + COL_TOTAL),
+        )
+
+        rows = [list(row) for row in region.Value]
+
+        for slot_index, product in enumerate(page_products):
+            item_offset = slot_index * row_step
+
+            rows[item_offset][COL_DESC] = product.get("descripcion", "")
+            rows[item_offset][COL_QTY] = product.get("cantidad", "")
+            rows[item_offset][COL_UNIT] = product.get("precio_unitario", "")
+            rows[item_offset][COL_TOTAL] = product.get("precio_total", "")
+
+            codigo = product.get("codigo", "")
+            rows[item_offset + 1][COL_DESC] = f"NUMERO DE PARTE: {codigo}"
+
+        region.Value = tuple(tuple(row) for row in rows)
+
+    print(f"Wrote {len(products)} item(s) across {pages_used} page(s).")
+    return pages_used
+
+
+def _write_products_xlsx(
+    ws,
+    products: List[Dict[str, Any]],
+    *,
+    first_page_start_row: int = 19,
+    second_page_start_row: int = 68,
+    start_col: int = 2,
+    items_per_page: int = 9,
+    row_step: int = 2,
+) -> int:
+    """
+    openpyxl twin of _write_products: writes into an already-loaded openpyxl
+    worksheet. In-process, so per-cell writes carry no marshaling cost.
+
+    Returns:
+        Number of pages used.
+    """
+    if not products:
+        raise ValueError("products is empty. Provide at least one product.")
+
+    page_row_step = _page_stride(first_page_start_row, second_page_start_row)
+
+    cell = ws.cell
+    for idx, product in enumerate(products):
+        page_index = idx // items_per_page          # 0-based page number
+        slot_index = idx % items_per_page           # 0..8 within the page
+
+        page_start_row = first_page_start_row + page_index * page_row_step
+        item_row = page_start_row + slot_index * row_step
+
+        cell(row=item_row, column=start_col + COL_DESC, value=product.get("descripcion", ""))
+        cell(row=item_row, column=start_col + COL_QTY, value=product.get("cantidad", ""))
+        cell(row=item_row, column=start_col + COL_UNIT, value=product.get("precio_unitario", ""))
+        cell(row=item_row, column=start_col + COL_TOTAL, value=product.get("precio_total", ""))
+
+        codigo = product.get("codigo", "")
+        cell(row=item_row + 1, column=start_col, value=f"NUMERO DE PARTE: {codigo}")
+
+    pages_used = (len(products) + items_per_page - 1) // items_per_page
+    print(f"Wrote {len(products)} item(s) across {pages_used} page(s).")
+    return pages_used
+
+
+def input_products_page(
+    products: List[Dict[str, Any]],
+    file_path: str,
+    *,
+    first_page_start_row: int = 19,
+    second_page_start_row: int = 68,
+    start_col: int = 2,
+    items_per_page: int = 9,
+    row_step: int = 2,
+    sheet_index: int = 1,
+    visible: bool = False,
+    use_com: bool = False,
+) -> None:
+    """
+    Writes products into a fixed invoice template on ONE worksheet, across multiple pages.
+
+    By default the workbook is edited in-process with openpyxl (no Excel
+    launch, no COM round-trips). Pass use_com=True to go through Excel COM
+    for template features openpyxl cannot preserve. For writing several
+    passes into the same workbook, prefer orchestrator.apply_all, which opens
+    the workbook only once.
+
     Args:
         products: List of product dicts.
         file_path: Path to the Excel file (existing preferred; will create if missing).
@@ -42,59 +168,78 @@ def input_products_page(
         items_per_page: How many items fit in one page (9).
         row_step: Row spacing between items within the same page.
         sheet_index: 1-based Excel sheet index.
-        visible: Show Excel while running (debugging).
+        visible: Show Excel while running (COM only, debugging).
+        use_com: Drive Excel via COM instead of openpyxl.
     """
-    if not products:
-        raise ValueError("products is empty. Provide at least one product.")
+    abs_path = os.path.abspath(file_path)
 
-    page_row_step = second_page_start_row - first_page_start_row
-    if page_row_step <= 0:
-        raise ValueError(
-            f"Invalid page stride: second_page_start_row ({second_page_start_row}) "
-            f"must be greater than first_page_start_row ({first_page_start_row})."
+    if not use_com:
+        wb = load_workbook(abs_path) if os.path.exists(abs_path) else Workbook()
+        ws = wb.worksheets[sheet_index - 1]
+        _write_products_xlsx(
+            ws,
+            products,
+            first_page_start_row=first_page_start_row,
+            second_page_start_row=second_page_start_row,
+            start_col=start_col,
+            items_per_page=items_per_page,
+            row_step=row_step,
         )
+        wb.save(abs_path)
+        return
 
-    abs_path = os.path.abspath(file_path)
+    # Validate before paying the Excel startup; a bad config should never
+    # boot Excel just to raise.
+    if not products:
+        raise ValueError("products is empty. Provide at least one product.")
+    _page_stride(first_page_start_row, second_page_start_row)
 
     excel = win32.DispatchEx("Excel.Application")
     excel.Visible = visible
     excel.DisplayAlerts = False
+    excel.AskToUpdateLinks = False
 
     wb = None
+    prev_calc = None
     try:
         if os.path.exists(abs_path):
-            wb = excel.Workbooks.Open(abs_path)
+            wb = excel.Workbooks.Open(
+                abs_path,
+                UpdateLinks=0,
+                ReadOnly=False,
+                IgnoreReadOnlyRecommended=True,
+                Notify=False,
+                AddToMru=False,
+                Local=True,
+            )
         else:
             wb = excel.Workbooks.Add()
             wb.SaveAs(abs_path)
 
         ws = wb.Worksheets(sheet_index)
 
-        for idx, product in enumerate(products):
-            page_index = idx // items_per_page          # 0-based page number
-            slot_index = idx % items_per_page           # 0..8 within the page
-
-            page_start_row = first_page_start_row + page_index * page_row_step
-            item_row = page_start_row + slot_index * row_step
-
-            COL_DESC = 0
-            COL_QTY = 6
-            COL_UNIT = 7
-            COL_TOTAL = 9  # <-- K relative to start_col=2 (B)
-
-            ws.Cells(item_row, start_col + COL_DESC).Value = product.get("descripcion", "")
-            ws.Cells(item_row, start_col + COL_QTY).Value = product.get("cantidad", "")
-            ws.Cells(item_row, start_col + COL_UNIT).Value = product.get("precio_unitario", "")
-            ws.Cells(item_row, start_col + COL_TOTAL).Value = product.get("precio_total", "")
-
-            codigo = product.get("codigo", "")
-            ws.Cells(item_row + 1, start_col).Value = f"NUMERO DE PARTE: {codigo}"
+        prev_calc = excel.Calculation
+        excel.ScreenUpdating = False
+        excel.EnableEvents = False
+        excel.Calculation = XL_CALCULATION_MANUAL
+
+        _write_products(
+            ws,
+            products,
+            first_page_start_row=first_page_start_row,
+            second_page_start_row=second_page_start_row,
+            start_col=start_col,
+            items_per_page=items_per_page,
+            row_step=row_step,
+        )
 
         wb.Save()
-        pages_used = (len(products) + items_per_page - 1) // items_per_page
-        print(f"Wrote {len(products)} item(s) across {pages_used} page(s) into: {file_path}")
 
     finally:
+        if prev_calc is not None:
+            excel.Calculation = prev_calc
+            excel.EnableEvents = True
+            excel.ScreenUpdating = True
         if wb is not None:
             wb.Close(SaveChanges=True)
         excel.Quit()
@@ -1,15 +1,15 @@
 from __future__ import annotations
 
 import shutil
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
+from typing import Iterable, List
 
 from products import load_products
-from invoicing import input_products_page
-from invoiceNumbering import apply_invoice_numbers
-from controlNumbering import apply_control_numbers
-from invoiceDating import apply_invoice_and_expiration_dates
-from prompts import _prompt_invoice_start, _prompt_control_start, prompt_invoice_date_range
+from invoiceWriter import write_invoice
+from orchestrator import ExcelSession, apply_all
+from prompts import DateRange, _prompt_invoice_start, _prompt_control_start, prompt_invoice_date_range
 
 
 # ---------------------------
@@ -39,6 +39,16 @@ def _compute_total_pages(num_items: int, items_per_page: int = ITEMS_PER_PAGE) -
     return (num_items + items_per_page - 1) // items_per_page
 
 
+def _new_invoice_path(output_dir: Path, *, filename_prefix: str = "invoice") -> Path:
+    """
+    Reserve a unique timestamped output path inside output_dir.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return output_dir / f"{filename_prefix}_{timestamp}.xlsx"
+
+
 def _create_invoice_from_template(
     template_path: Path,
     output_dir: Path,
@@ -51,60 +61,109 @@ def _create_invoice_from_template(
     if not template_path.exists():
         raise FileNotFoundError(f"Template not found: {template_path}")
 
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_path = output_dir / f"{filename_prefix}_{timestamp}.xlsx"
-
+    output_path = _new_invoice_path(output_dir, filename_prefix=filename_prefix)
     shutil.copy2(template_path, output_path)
     return output_path
 
 
-def main() -> None:
-    products = load_products(CSV_FILE)
-    total_pages = _compute_total_pages(len(products))
+@dataclass(frozen=True)
+class InvoiceConfig:
+    """Inputs for one generated invoice (everything the prompts collect)."""
 
-    # Prompts (collect inputs first)
-    invoice_start = _prompt_invoice_start()
-    control_start = _prompt_control_start()
-    date_range = prompt_invoice_date_range()
+    invoice_start: int
+    control_start: int
+    date_range: DateRange
+    use_com: bool = False
 
-    # Create a fresh invoice file from template
-    xlsx_file = _create_invoice_from_template(
-        template_path=TEMPLATE_FILE,
-        output_dir=INVOICE_DIR,
-        filename_prefix="invoice",
-    )
 
-    # 1) Write product line items
-    input_products_page(
-        products=products,
-        file_path=str(xlsx_file),
-        first_page_start_row=FIRST_PAGE_ITEMS_ROW,
-    )
+def generate_invoice(
+    cfg: InvoiceConfig,
+    *,
+    session: ExcelSession | None = None,
+) -> Path:
+    """
+    Produce one finished invoice from the template and return its path.
 
-    # 2) Invoice numbering
-    apply_invoice_numbers(
-        file_path=str(xlsx_file),
-        start_number=invoice_start,
-        total_pages=total_pages,
-    )
+    All four passes (products, invoice numbers, control numbers, dates) share
+    a single workbook open/save cycle. Pass a shared ExcelSession when
+    generating several COM invoices in a batch so Excel starts only once.
+    """
+    products = load_products(CSV_FILE)
+    total_pages = _compute_total_pages(len(products))
 
-    # 3) Control numbering
-    apply_control_numbers(
-        file_path=str(xlsx_file),
-        start_number=control_start,
+    if cfg.use_com:
+        # COM edits on disk, so start from a fresh copy of the template.
+        xlsx_file = _create_invoice_from_template(
+            template_path=TEMPLATE_FILE,
+            output_dir=INVOICE_DIR,
+            filename_prefix="invoice",
+        )
+
+        apply_all(
+            file_path=str(xlsx_file),
+            products=products,
+            invoice_start=cfg.invoice_start,
+            control_start=cfg.control_start,
+            start_date=cfg.date_range.start,
+            end_date=cfg.date_range.end,
+            total_pages=total_pages,
+            first_page_items_row=FIRST_PAGE_ITEMS_ROW,
+            control_first_cell=CONTROL_FIRST_CELL,
+            control_second_cell=CONTROL_SECOND_CELL,
+            use_com=True,
+            session=session,
+        )
+        return xlsx_file
+
+    # In-process path: write template -> finished invoice in one pass, no
+    # intermediate copy of the template on disk.
+    if not TEMPLATE_FILE.exists():
+        raise FileNotFoundError(f"Template not found: {TEMPLATE_FILE}")
+
+    xlsx_file = _new_invoice_path(INVOICE_DIR, filename_prefix="invoice")
+    write_invoice(
+        template_path=str(TEMPLATE_FILE),
+        output_path=str(xlsx_file),
+        products=products,
+        invoice_start=cfg.invoice_start,
+        control_start=cfg.control_start,
+        start_date=cfg.date_range.start,
+        end_date=cfg.date_range.end,
         total_pages=total_pages,
-        first_page_cell=CONTROL_FIRST_CELL,
-        second_page_cell=CONTROL_SECOND_CELL,
+        first_page_items_row=FIRST_PAGE_ITEMS_ROW,
+        control_first_cell=CONTROL_FIRST_CELL,
+        control_second_cell=CONTROL_SECOND_CELL,
     )
+    return xlsx_file
 
-    # 4) Dates
-    apply_invoice_and_expiration_dates(
-        file_path=str(xlsx_file),
-        total_pages=total_pages,
-        start_date=date_range.start,
-        end_date=date_range.end,
+
+def generate_invoices(configs: Iterable[InvoiceConfig]) -> List[Path]:
+    """
+    Batch runner: generate one invoice per config, reusing a single Excel
+    session for every COM-backed config so the multi-second Excel startup is
+    paid at most once. Excel quits only after the last invoice.
+    """
+    outputs: List[Path] = []
+    with ExcelSession() as session:
+        for cfg in configs:
+            outputs.append(
+                generate_invoice(cfg, session=session if cfg.use_com else None)
+            )
+    return outputs
+
+
+def main() -> None:
+    # Prompts (collect inputs first)
+    invoice_start = _prompt_invoice_start()
+    control_start = _prompt_control_start()
+    date_range = prompt_invoice_date_range()
+
+    xlsx_file = generate_invoice(
+        InvoiceConfig(
+            invoice_start=invoice_start,
+            control_start=control_start,
+            date_range=date_range,
+        )
     )
 
     print(f"\n✅ Finished invoice created: {xlsx_file}")
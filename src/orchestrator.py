@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import os
+from datetime import date
+from typing import Any, Dict, List
+
+import win32com.client as win32  # type: ignore
+from openpyxl import load_workbook
+
+from invoicing import XL_CALCULATION_MANUAL, _write_products, _write_products_xlsx
+from invoiceNumbering import _plan_invoice_numbers, _write_invoice_numbers, _write_invoice_numbers_xlsx
+from controlNumbering import _validate_control_inputs, _write_control_numbers, _write_control_numbers_xlsx
+from invoiceDating import (
+    InvoiceDatesConfig,
+    _validate_date_inputs,
+    _write_dates,
+    _write_dates_xlsx,
+)
+
+
+class ExcelSession:
+    """
+    Reusable Excel COM session.
+
+    DispatchEx costs seconds of Excel startup, so when several invoices are
+    generated in a batch the application is created lazily on first use and
+    kept alive across workbooks: each workbook is opened, written, and
+    close-saved against the same process, and Quit() runs only once at the
+    end (or on context-manager exit).
+    """
+
+    def __init__(self, *, visible: bool = False) -> None:
+        self.visible = visible
+        self._excel = None
+        self._wb = None
+        self._prev_calc = None
+
+    @property
+    def excel(self):
+        if self._excel is None:
+            self._excel = win32.DispatchEx("Excel.Application")
+            self._excel.Visible = self.visible
+            self._excel.DisplayAlerts = False
+            self._excel.AskToUpdateLinks = False
+        return self._excel
+
+    def open(self, file_path: str, *, sheet_index: int = 1):
+        """
+        Open a workbook and return its worksheet, with screen updates, events,
+        and recalculation suspended until close_save(). One workbook at a time.
+        """
+        if self._wb is not None:
+            raise RuntimeError("A workbook is already open in this session.")
+
+        excel = self.excel
+        # Explicit args skip link updates, read-only prompts, notify checks,
+        # and recent-files bookkeeping on every open.
+        self._wb = excel.Workbooks.Open(
+            os.path.abspath(file_path),
+            UpdateLinks=0,
+            ReadOnly=False,
+            IgnoreReadOnlyRecommended=True,
+            Notify=False,
+            AddToMru=False,
+            Local=True,
+        )
+        ws = self._wb.Worksheets(sheet_index)
+
+        self._prev_calc = excel.Calculation
+        excel.ScreenUpdating = False
+        excel.EnableEvents = False
+        excel.Calculation = XL_CALCULATION_MANUAL
+        return ws
+
+    def close_save(self) -> None:
+        """Restore application state, then save and close the current workbook."""
+        if self._wb is None:
+            return
+
+        excel = self._excel
+        if self._prev_calc is not None:
+            excel.Calculation = self._prev_calc
+            excel.EnableEvents = True
+            excel.ScreenUpdating = True
+            self._prev_calc = None
+
+        wb = self._wb
+        self._wb = None
+        wb.Save()
+        wb.Close(SaveChanges=True)
+
+    def quit(self) -> None:
+        """Close any open workbook (saving changes) and shut Excel down."""
+        if self._excel is None:
+            return
+        try:
+            self.close_save()
+        finally:
+            self._excel.Quit()
+            self._excel = None
+
+    def __enter__(self) -> "ExcelSession":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.quit()
+
+
+def apply_all(
+    file_path: str,
+    products: List[Dict[str, Any]],
+    *,
+    invoice_start: int,
+    control_start: int,
+    start_date: date,
+    end_date: date,
+    total_pages: int,
+    first_page_items_row: int = 19,
+    control_first_cell: str = "K6",
+    control_second_cell: str = "K55",
+    dates_config: InvoiceDatesConfig = InvoiceDatesConfig(),
+    sheet_index: int = 1,
+    visible: bool = False,
+    use_com: bool = False,
+    session: ExcelSession | None = None,
+) -> None:
+    """
+    Run all four write passes (products, invoice numbers, control numbers, dates)
+    against a single open workbook.
+
+    By default the workbook is edited in-process with openpyxl: loaded once,
+    all passes write into the same worksheet, saved once — no Excel launch
+    and no COM round-trips. Pass use_com=True to drive Excel COM instead
+    (template features openpyxl cannot preserve); that path still starts
+    Excel only once and does one open/save cycle, where chaining the
+    standalone apply_* functions would cost three extra Excel startups.
+    When generating many invoices, pass a shared ExcelSession so the Excel
+    startup is paid once for the whole batch.
+
+    Args:
+        file_path: Existing .xlsx file (copied from the template beforehand).
+        products: List of product dicts from load_products().
+        invoice_start: First invoice number (page 1).
+        control_start: First control number (page 1).
+        start_date, end_date: Inclusive invoice date range (weekdays).
+        total_pages: Pages that exist/should be written.
+        first_page_items_row: Row where item #1 of page 1 starts.
+        control_first_cell: Control number cell for page 1.
+        control_second_cell: Control number cell for page 2.
+        dates_config: Cell anchors and rules for the dating pass.
+        sheet_index: 1-based worksheet index.
+        visible: Show Excel UI (COM only, debugging).
+        use_com: Drive Excel via COM instead of openpyxl.
+        session: Existing ExcelSession to reuse (COM only); the caller keeps
+            ownership and Quit() is not called here.
+    """
+    abs_path = os.path.abspath(file_path)
+    if not os.path.exists(abs_path):
+        raise FileNotFoundError(f"Excel file not found: {abs_path}")
+
+    if not use_com:
+        wb = load_workbook(abs_path)
+        ws = wb.worksheets[sheet_index - 1]
+
+        _write_products_xlsx(
+            ws,
+            products,
+            first_page_start_row=first_page_items_row,
+        )
+
+        _write_invoice_numbers_xlsx(
+            ws,
+            start_number=invoice_start,
+            total_pages=total_pages,
+        )
+
+        _write_control_numbers_xlsx(
+            ws,
+            start_number=control_start,
+            total_pages=total_pages,
+            first_page_cell=control_first_cell,
+            second_page_cell=control_second_cell,
+        )
+
+        _write_dates_xlsx(
+            ws,
+            total_pages=total_pages,
+            start_date=start_date,
+            end_date=end_date,
+            config=dates_config,
+        )
+
+        wb.save(abs_path)
+        return
+
+    # Validate everything deterministic before paying the Excel startup;
+    # a bad config should never boot Excel just to raise.
+    if not products:
+        raise ValueError("products is empty. Provide at least one product.")
+    _plan_invoice_numbers(
+        start_number=invoice_start,
+        total_pages=total_pages,
+        first_page_cell="E10",  # writer defaults, see _write_invoice_numbers
+        second_page_cell="E59",
+        max_pages=50,
+    )
+    _validate_control_inputs(
+        start_number=control_start,
+        first_page_cell=control_first_cell,
+        second_page_cell=control_second_cell,
+        min_jump=1,  # writer defaults, see _write_control_numbers
+        max_jump=11,
+    )
+    _validate_date_inputs(start_date=start_date, end_date=end_date, config=dates_config)
+
+    own_session = session is None
+    if own_session:
+        session = ExcelSession(visible=visible)
+
+    try:
+        ws = session.open(abs_path, sheet_index=sheet_index)
+
+        _write_products(
+            ws,
+            products,
+            first_page_start_row=first_page_items_row,
+        )
+
+        _write_invoice_numbers(
+            ws,
+            start_number=invoice_start,
+            total_pages=total_pages,
+        )
+
+        _write_control_numbers(
+            ws,
+            start_number=control_start,
+            total_pages=total_pages,
+            first_page_cell=control_first_cell,
+            second_page_cell=control_second_cell,
+        )
+
+        _write_dates(
+            ws,
+            total_pages=total_pages,
+            start_date=start_date,
+            end_date=end_date,
+            config=dates_config,
+        )
+
+    finally:
+        if own_session:
+            session.quit()
+        else:
+            session.close_save()
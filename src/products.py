@@ -1,20 +1,33 @@
 import csv
 from pathlib import Path
 
-# products.py
-import csv
-from pathlib import Path
 
 def load_products(csv_file: Path):
-    products = []
+    """
+    Read the product CSV into a list of typed product dicts.
+
+    Column positions are resolved once from the header row and each line is
+    converted with a plain csv.reader, instead of csv.DictReader building a
+    throwaway full-row dict per line before the typed dict is constructed.
+    """
     with open(csv_file, newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            products.append({
-                "codigo": row["codigo"],
-                "descripcion": row["Descripcion"],
-                "cantidad": int(row["Cantidad"]),
-                "precio_unitario": float(row["PrecioUnitario"]),
-                "precio_total": float(row["PrecioTotal"])
-            })
-    return products
+        reader = csv.reader(f)
+        header = next(reader)
+        col = {name: i for i, name in enumerate(header)}
+
+        i_codigo = col["codigo"]
+        i_descripcion = col["Descripcion"]
+        i_cantidad = col["Cantidad"]
+        i_precio_unitario = col["PrecioUnitario"]
+        i_precio_total = col["PrecioTotal"]
+
+        return [
+            {
+                "codigo": row[i_codigo],
+                "descripcion": row[i_descripcion],
+                "cantidad": int(row[i_cantidad]),
+                "precio_unitario": float(row[i_precio_unitario]),
+                "precio_total": float(row[i_precio_total]),
+            }
+            for row in reader
+        ]
@@ -1,6 +1,6 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from datetime import date
+from datetime import date, datetime
 
 def _prompt_invoice_start() -> int:
     """
@@ -83,13 +83,7 @@ def _prompt_weekday_date(prompt: str) -> date:
 
 
 def _parse_ddmmyyyy(raw: str) -> date | None:
-    parts = raw.split("/")
-    if len(parts) != 3:
-        return None
     try:
-        d = int(parts[0])
-        m = int(parts[1])
-        y = int(parts[2])
-        return date(year=y, month=m, day=d)
+        return datetime.strptime(raw, "%d/%m/%Y").date()
     except ValueError:
         return None